@@ -21,12 +21,37 @@ class BaseComponent(abc.ABC):
 class PolymorphicComponent(BaseComponent):
     """Multi-instance component."""
 
+    __kind__: typing.ClassVar[str]
+    """The component kind, set by each polymorphic base class."""
+
+    _registry: typing.ClassVar[dict[str, type["PolymorphicComponent"]]] = {}
+    """Kind name -> component base class, built at class definition time."""
+
     instance_id: str
     """The id of running component instance"""
 
     config: dict[str, typing.Any]
     """Component instance specified configuration"""
 
+    def __init_subclass__(cls, **kwargs: typing.Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Only classes declaring their own __kind__ define a kind; plugin
+        # subclasses inherit it and must not re-register.
+        if "__kind__" in cls.__dict__:
+            PolymorphicComponent._registry[cls.__kind__] = cls
+
+    @classmethod
+    def get_kind_class(cls, kind: str) -> type["PolymorphicComponent"]:
+        """Resolve a component kind name to its base class in O(1).
+
+        Dispatchers handling `{"kind": ...}` messages use this instead of
+        walking an isinstance/issubclass chain per message.
+
+        Raises:
+            KeyError: If no polymorphic component declares the kind.
+        """
+        return cls._registry[kind]
+
 
 class NoneComponent(BaseComponent):
     """The component that does nothing, just acts as a placeholder."""
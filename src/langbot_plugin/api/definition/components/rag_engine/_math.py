@@ -0,0 +1,39 @@
+"""Vectorized scoring kernels for in-process reranking.
+
+These helpers stay on numpy's BLAS-backed matrix ops (OpenBLAS/MKL dispatch
+to AVX2/AVX-512/NEON at runtime), so scoring 50-200 candidates per retrieve
+is one `M @ q` instead of a Python loop over vectors.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def cosine_scores(
+    q: np.ndarray, M: np.ndarray, assume_normalized: bool = False
+) -> np.ndarray:
+    """Compute cosine similarity between a query vector and candidate rows.
+
+    Args:
+        q: Query vector of shape `[D]`.
+        M: Candidate matrix of shape `[N, D]`.
+        assume_normalized: Skip normalization when both `q` and the rows of
+            `M` are already L2-normalized (the convention for stored
+            embeddings); the computation reduces to one matrix-vector
+            product.
+
+    Returns:
+        A float32 array of shape `[N]` with one similarity per row.
+    """
+    q = np.asarray(q, dtype=np.float32)
+    M = np.asarray(M, dtype=np.float32)
+    if assume_normalized:
+        return M @ q
+
+    q_norm = np.linalg.norm(q)
+    row_norms = np.linalg.norm(M, axis=1)
+    # Guard zero vectors; their similarity is defined as 0.
+    denom = row_norms * (q_norm if q_norm else 1.0)
+    denom = np.where(denom == 0.0, 1.0, denom)
+    return ((M @ q) / denom).astype(np.float32)
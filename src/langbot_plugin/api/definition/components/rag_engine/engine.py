@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import abc
+from typing import Any, Callable
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+from langbot_plugin.api.definition.components.base import PolymorphicComponent
+from langbot_plugin.api.definition.components.rag_engine.host_services import HostServices
+from langbot_plugin.api.entities.builtin.rag.context import (
+    RetrievalContext,
+    RetrievalResponse,
+)
+from langbot_plugin.api.entities.builtin.rag.models import (
+    IngestionContext,
+    IngestionResult,
+)
+
+
+_compiled_validators: dict[int, tuple[dict[str, Any], Callable[[dict[str, Any]], Any]]] = {}
+"""Compiled validators keyed by schema identity, pinning the schema.
+
+Schemas are cached per engine class (see `RAGEngine.get_*_settings_schema`),
+so their `id()` is stable and each schema is compiled exactly once. Each
+entry keeps a reference to its schema: that pins the dict so its id cannot
+be recycled by a later allocation, and lets the lookup verify the cached
+schema `is` the argument — a freed schema (e.g. after
+`clear_schema_cache()`) can never hand its validator to a different dict.
+"""
+
+
+def compile_settings_validator(
+    schema: dict[str, Any],
+) -> Callable[[dict[str, Any]], Any]:
+    """Get a compiled validator for a settings schema.
+
+    With `fastjsonschema` installed (the `validation` extra), the schema is
+    AOT-compiled to a native validator function once, moving the schema walk
+    out of the per-request path. Without it, validation is a no-op
+    passthrough — the host is then responsible for validating settings.
+
+    Args:
+        schema: A settings JSON Schema; must be the identity-stable dict
+            returned by the cached schema getters.
+
+    Returns:
+        A callable that validates a settings dict and returns it.
+    """
+    cached = _compiled_validators.get(id(schema))
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+    if fastjsonschema is not None:
+        validator = fastjsonschema.compile(schema)
+    else:
+        validator = lambda settings: settings  # noqa: E731
+    _compiled_validators[id(schema)] = (schema, validator)
+    return validator
+
+
+class RAGEngine(PolymorphicComponent):
+    """The RAG engine component.
+
+    A RAG engine owns the full lifecycle of a knowledge base: document
+    ingestion, retrieval, and deletion. The host injects its embedding,
+    vector storage and file services as `self.services` before
+    `initialize()` is called.
+    """
+
+    __kind__ = "RAGEngine"
+
+    RERANK_SETTINGS_PROPERTIES: dict[str, Any] = {
+        "enable_rerank": {
+            "type": "boolean",
+            "default": False,
+            "description": "Apply second-stage reranking to search results.",
+        },
+        "rerank_top_n": {
+            "type": "integer",
+            "default": 50,
+            "description": "Number of first-stage candidates fed to the reranker.",
+        },
+        "rerank_model": {
+            "type": "string",
+            "default": "",
+            "description": "Reranker model identifier; empty uses the host default.",
+        },
+    }
+    """Standard reranking properties for retrieval settings schemas.
+
+    Engines that support the two-stage pipeline merge these into the
+    `properties` of `get_retrieval_settings_schema` instead of redefining
+    their own field names.
+    """
+
+    SEARCH_TUNING_PROPERTIES: dict[str, Any] = {
+        "ef": {
+            "type": "integer",
+            "default": 128,
+            "description": "HNSW search-time candidate list size; lower is faster, higher recalls more.",
+        },
+    }
+    """Standard index tuning properties for retrieval settings schemas.
+
+    Engines backed by a tunable index merge these into the `properties` of
+    `get_retrieval_settings_schema` and thread the values through the
+    `search_params` argument of the vector store search methods.
+    """
+
+    services: HostServices
+    """Host capabilities (embedder, vector store, file access)."""
+
+    # ========== Lifecycle Hooks ==========
+
+    async def on_knowledge_base_create(self, kb_id: str, config: dict[str, Any]) -> None:
+        """Called when a knowledge base using this engine is created.
+
+        Args:
+            kb_id: The knowledge base identifier.
+            config: Creation settings provided by the user.
+        """
+        pass
+
+    async def on_knowledge_base_delete(self, kb_id: str) -> None:
+        """Called when a knowledge base using this engine is deleted.
+
+        Args:
+            kb_id: The knowledge base identifier.
+        """
+        pass
+
+    # ========== Settings Schemas ==========
+
+    # Schemas are fetched on every UI render and every retrieval call, so
+    # the build runs once per subclass and the getters return the cached
+    # dict. Builders MUST be pure: same schema every call, no dependence on
+    # instance state. The stable identity of the returned dict also enables
+    # identity-keyed memoization downstream (e.g. compiled validators).
+
+    @abc.abstractmethod
+    def _build_creation_settings_schema(self) -> dict[str, Any]:
+        """Build the JSON Schema for knowledge base creation settings.
+
+        Returns:
+            A JSON Schema dict describing the settings shown when a
+            knowledge base using this engine is created.
+        """
+        pass
+
+    @abc.abstractmethod
+    def _build_retrieval_settings_schema(self) -> dict[str, Any]:
+        """Build the JSON Schema for retrieval settings.
+
+        Returns:
+            A JSON Schema dict describing the per-retrieval settings.
+        """
+        pass
+
+    def _cached_schema(self, key: str, builder: Any) -> dict[str, Any]:
+        cache = self.__class__.__dict__.get("_schema_cache")
+        if cache is None:
+            cache = {}
+            setattr(self.__class__, "_schema_cache", cache)
+        if key not in cache:
+            cache[key] = builder()
+        return cache[key]
+
+    def get_creation_settings_schema(self) -> dict[str, Any]:
+        """Get the JSON Schema for knowledge base creation settings, cached per class."""
+        return self._cached_schema("creation", self._build_creation_settings_schema)
+
+    def get_retrieval_settings_schema(self) -> dict[str, Any]:
+        """Get the JSON Schema for retrieval settings, cached per class."""
+        return self._cached_schema("retrieval", self._build_retrieval_settings_schema)
+
+    @classmethod
+    def clear_schema_cache(cls) -> None:
+        """Drop the cached schemas, e.g. after a hot reload in development."""
+        if "_schema_cache" in cls.__dict__:
+            cls.__dict__["_schema_cache"].clear()
+
+    def validate_creation_settings(self, settings: dict[str, Any]) -> dict[str, Any]:
+        """Validate creation settings against the pre-compiled schema validator.
+
+        Call this at the top of `ingest` / `on_knowledge_base_create` instead
+        of walking the schema ad hoc.
+
+        Raises:
+            fastjsonschema.JsonSchemaException: If the settings are invalid
+                (when the `validation` extra is installed).
+        """
+        compile_settings_validator(self.get_creation_settings_schema())(settings)
+        return settings
+
+    def validate_retrieval_settings(self, settings: dict[str, Any]) -> dict[str, Any]:
+        """Validate retrieval settings against the pre-compiled schema validator.
+
+        Call this at the top of `retrieve` instead of walking the schema ad
+        hoc.
+
+        Raises:
+            fastjsonschema.JsonSchemaException: If the settings are invalid
+                (when the `validation` extra is installed).
+        """
+        compile_settings_validator(self.get_retrieval_settings_schema())(settings)
+        return settings
+
+    # ========== Core Methods ==========
+
+    @abc.abstractmethod
+    async def ingest(self, context: IngestionContext) -> IngestionResult:
+        """Ingest a document into the knowledge base.
+
+        This method should:
+        1. Read the file with
+           `async for buf in self.services.open_file(context.file_object.storage_path)`,
+           feeding chunks straight into the parser
+        2. Parse and chunk the content
+        3. Embed the chunks using `await self.services.embedder.embed_documents(...)`
+        4. Store the vectors using `await self.services.vector_store.upsert(...)`
+
+        Steps 3 and 4 MUST be batched: materialize the document's chunks and
+        use `host_services.bulk_upsert(...)` (one embed and one upsert per
+        size-bounded batch) or `host_services.stream_ingest(...)` (pipelined
+        variant) rather than calling `upsert` once per chunk — per-chunk
+        upserts pay one round-trip per chunk.
+
+        For large documents, `host_services.ingest_pipeline(...)` runs steps
+        1-4 as concurrent stages with bounded queues, overlapping parsing
+        with the embed and upsert requests at O(queue_depth) memory.
+
+        When `context.async_batch` is set and the embedder supports
+        `submit_embed_batch`, submit the texts, return a result with status
+        PENDING and the `BatchHandle` in `metadata["batch_handle"]`; the
+        host polls the job and completes the upsert when it finishes.
+
+        Args:
+            context: Ingestion context containing file info and settings.
+
+        Returns:
+            Ingestion result with status and metadata.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def retrieve(self, context: RetrievalContext) -> RetrievalResponse:
+        """Retrieve relevant content from the knowledge base.
+
+        This method should:
+        1. Embed the query using `await self.services.embedder.embed_documents([context.query])`
+        2. If `self.services.semantic_cache` is set, check it with the query
+           vector and return the cached response on a hit
+        3. Search using `await self.services.vector_store.search(...)`;
+           when query rewriting yields multiple sub-queries, embed them all
+           and issue one `search_batch(...)` instead of one search per query
+        4. Optional two-stage reranking: when `enable_rerank` is set in the
+           retrieval settings, search for `rerank_top_n` candidates (not
+           `top_k`) and narrow them with
+           `await self.services.reranker.rerank(query, candidates, top_k)`
+        5. Store the response in the semantic cache and return it
+
+        Args:
+            context: Retrieval context with query and settings.
+
+        Returns:
+            Structured retrieval response.
+        """
+        pass
+
+    @abc.abstractmethod
+    async def delete_document(self, kb_id: str, document_id: str) -> bool:
+        """Delete a document and its associated data from the knowledge base.
+
+        Push the predicate down to the store in one call:
+
+            await self.services.vector_store.delete(
+                collection_id, filters={"document_id": document_id}
+            )
+
+        Do NOT enumerate the document's chunk ids via paginated searches and
+        delete by id — the store evaluates the filter server-side.
+
+        Args:
+            kb_id: Knowledge base identifier.
+            document_id: Document identifier to delete.
+
+        Returns:
+            True if deletion was successful.
+        """
+        pass
@@ -0,0 +1,1170 @@
+"""Host service contracts for RAG engine components.
+
+These protocols describe the capabilities (embedding, vector storage, file
+access) that the host exposes to `RAGEngine` instances. Plugins program
+against the protocols; the host provides the concrete implementations and
+injects them into the component as `self.services`.
+
+The protocols are `runtime_checkable`, so isinstance checks run as fast C
+attribute probes; even so, perform capability checks once per plugin load
+and cache the result rather than per call. Host-side implementations
+should declare `__slots__` — they are instantiated per knowledge base and
+hold only a couple of fields, so dropping the per-instance `__dict__`
+saves ~400B each and speeds attribute access.
+"""
+
+from __future__ import annotations
+
+import abc
+import array
+import asyncio
+import collections
+import hashlib
+import os
+import sqlite3
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Literal,
+    Protocol,
+    runtime_checkable,
+)
+
+import aiofiles
+import httpx
+import numpy as np
+import pydantic
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+from langbot_plugin.api.definition.components.rag_engine._math import cosine_scores
+from langbot_plugin.api.entities.builtin.rag.context import RetrievalResponse
+from langbot_plugin.api.entities.builtin.rag.models import TextChunk
+
+VectorDtype = Literal["fp32", "fp16", "int8"]
+"""Transport/storage precision for vector payloads.
+
+"fp16" halves the bytes on the wire with negligible recall loss for
+normalized embeddings; "int8" quarters them using per-vector symmetric
+quantization. Plugins should pass pre-normalized vectors so the
+dequantization error stays bounded.
+"""
+
+
+class BatchHandle(pydantic.BaseModel):
+    """Handle to an asynchronous embedding batch job."""
+
+    provider_batch_id: str
+    """Provider-side job identifier (e.g. an OpenAI /batches id)."""
+
+    collection_id: str
+    """Collection the embeddings are destined for."""
+
+    chunk_ids: list[str]
+    """Vector ids, in the order the texts were submitted."""
+
+
+class PendingStatus(pydantic.BaseModel):
+    """Status of a still-running embedding batch job."""
+
+    status: str
+    """Provider-specific state, e.g. "validating" or "in_progress"."""
+
+
+@runtime_checkable
+class EmbedderProtocol(Protocol):
+    """Embedding service provided by the host.
+
+    Implementations are expected to be I/O-bound (remote embedding APIs), so
+    the contract includes explicit micro-batching knobs: callers may pass any
+    number of texts to `embed_documents` and the implementation splits the
+    work into sub-batches of at most `max_batch_size` texts, dispatching up
+    to `max_concurrency` sub-batches concurrently.
+
+    HTTP-backed implementations MUST reuse one pooled client (see
+    `create_embedding_http_client`) per `HostServices` instance for all
+    sub-batches, and close it in `HostServices.aclose`. Opening a fresh TLS
+    connection per request costs 50-150ms of handshake plus TCP slow-start,
+    which dominates under burst ingestion fan-out.
+    """
+
+    @property
+    def model_id(self) -> str:
+        """Identifier of the underlying embedding model."""
+        ...
+
+    @property
+    def max_batch_size(self) -> int:
+        """Maximum number of texts per upstream embedding request."""
+        ...
+
+    @property
+    def max_concurrency(self) -> int:
+        """Maximum number of in-flight embedding requests."""
+        ...
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a list of texts, returning vectors in input order."""
+        ...
+
+    def embed_documents_stream(
+        self, texts: list[str]
+    ) -> AsyncIterator[tuple[list[int], list[list[float]]]]:
+        """Embed texts, yielding `(input_indices, vectors)` per sub-batch.
+
+        Sub-batches are yielded as soon as they complete (not necessarily in
+        input order), so callers can overlap downstream work (e.g. vector
+        upserts) with the remaining embedding requests.
+        """
+        ...
+
+    async def embed_documents_np(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into a contiguous float32 array of shape `[N, D]`.
+
+        This is the hot-path variant of `embed_documents`: one ndarray
+        replaces N lists of Python float objects (roughly 8-10x less memory
+        per batch) and keeps vectors in a SIMD-friendly contiguous layout
+        for downstream scoring.
+        """
+        ...
+
+    async def submit_embed_batch(
+        self,
+        texts: list[str],
+        collection_id: str,
+        chunk_ids: list[str],
+    ) -> BatchHandle:
+        """Submit texts to the provider's asynchronous batch endpoint.
+
+        Optional capability for large offline ingests: providers like
+        OpenAI run /batches jobs at half the synchronous price with up to
+        24h turnaround, decoupling ingest from embedding wall-clock time.
+        Implementations without an async batch endpoint raise
+        `NotImplementedError`.
+
+        Returns:
+            A handle to poll with `poll_embed_batch`.
+        """
+        ...
+
+    async def poll_embed_batch(
+        self, handle: BatchHandle
+    ) -> list[list[float]] | PendingStatus:
+        """Poll an asynchronous embedding batch job.
+
+        Returns:
+            The vectors (in submission order) once the job completes, or a
+            `PendingStatus` while it is still running.
+        """
+        ...
+
+
+@runtime_checkable
+class VectorStoreProtocol(Protocol):
+    """Vector storage service provided by the host."""
+
+    async def upsert(
+        self,
+        collection_id: str,
+        ids: list[str],
+        vectors: list[list[float]],
+        metadatas: list[dict[str, Any]],
+        vectors_arrow: bytes | None = None,
+    ) -> None:
+        """Insert or update vectors in a collection.
+
+        `ids` SHOULD be content-derived (see `chunk_id`) so upserts are
+        idempotent and duplicate chunks collapse; implementations may
+        short-circuit ids that already exist in the collection.
+
+        `vectors_arrow`, when set, replaces `ids` and `vectors` (callers
+        then pass them empty) with an Arrow IPC stream built by
+        `_arrow.encode_vector_batch`; implementations decode it with
+        `_arrow.decode_vector_batch` into a zero-copy `[N, D]` view. Use
+        it for bulk upserts where nested-list serialization would
+        dominate; keep the list API for small calls.
+        """
+        ...
+
+    async def search(
+        self,
+        collection_id: str,
+        query_vector: list[float],
+        top_k: int,
+        filters: dict[str, Any] | None = None,
+        search_params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search a collection, returning entries with id, metadata and distance.
+
+        `search_params` carries index-level, per-query tunables that trade
+        recall for latency; implementations forward the keys they understand
+        to the backend and ignore the rest. Accepted keys:
+
+        - `ef` (int): HNSW search-time candidate list size.
+        - `nprobe` (int): IVF probe count.
+        - `exact` (bool): Bypass the ANN index and scan exhaustively.
+        - `rescore_dtype` (str): Precision for distance rescoring of
+          quantized storage ("fp32" | "fp16").
+        """
+        ...
+
+    async def upsert_stream(
+        self,
+        collection_id: str,
+        stream: AsyncIterator[
+            tuple[list[str], list[list[float]], list[dict[str, Any]]]
+        ],
+    ) -> None:
+        """Insert or update vectors from a stream of `(ids, vectors, metadatas)` batches.
+
+        Each batch is written as soon as it is pulled from the stream, so
+        embedding and storage round-trips overlap and only one batch of
+        vectors is materialized at a time.
+        """
+        ...
+
+    async def upsert_np(
+        self,
+        collection_id: str,
+        ids: list[str],
+        vectors: np.ndarray,
+        metadatas: list[dict[str, Any]],
+        vector_dtype: VectorDtype = "fp16",
+    ) -> None:
+        """Insert or update vectors from a contiguous float32 `[N, D]` array.
+
+        Hot-path variant of `upsert`: implementations should pass the buffer
+        through to the backend (raw bytes plus shape) instead of expanding
+        it into nested Python lists. `vector_dtype` selects the transport
+        precision; use `encode_vectors`/`decode_vectors` on the two sides of
+        the boundary.
+        """
+        ...
+
+    async def search_np(
+        self,
+        collection_id: str,
+        query_vector: np.ndarray,
+        top_k: int,
+        filters: dict[str, Any] | None = None,
+        vector_dtype: VectorDtype = "fp16",
+        search_params: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search with a float32 query vector; see `search`."""
+        ...
+
+    async def search_batch(
+        self,
+        collection_id: str,
+        query_vectors: np.ndarray,
+        top_k: int,
+        filters: dict[str, Any] | None = None,
+        vector_dtype: VectorDtype = "fp16",
+        search_params: dict[str, Any] | None = None,
+        vectors_arrow: bytes | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Search a collection with multiple query vectors in one call.
+
+        `query_vectors` is a contiguous float32 `[Q, D]` array; the result
+        holds one entry list per query, in query order. Implementations
+        should forward the whole batch to the backend's batch API rather
+        than looping over single-query searches, amortizing the IPC
+        round-trip and the index traversal across queries.
+
+        `vectors_arrow`, when set, carries the query batch as an Arrow IPC
+        stream instead of `query_vectors` (then passed empty); see
+        `upsert`. Hosts that expose results over the process boundary
+        frame them with `_arrow.encode_search_results` so the plugin side
+        skips `list[dict]` rehydration.
+        """
+        ...
+
+    async def delete(
+        self,
+        collection_id: str,
+        ids: list[str] | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> None:
+        """Delete vectors by id or by metadata filters.
+
+        Implementations MUST evaluate `filters` server-side — translated to
+        the backend's native predicate (e.g. a SQL `DELETE ... WHERE` or the
+        store's filter expression) — and MUST NOT enumerate matching ids
+        client-side to delete them: one pushed-down predicate is a single
+        round-trip and an index operation, versus O(N/page) paginated scans.
+        """
+        ...
+
+
+@runtime_checkable
+class RerankerProtocol(Protocol):
+    """Second-stage reranking service provided by the host.
+
+    Used in a two-stage retrieval pipeline: the vector store returns a
+    generous candidate set (`rerank_top_n`, typically ~50) with the cheap
+    first-stage search, then the reranker scores the (query, candidate)
+    pairs with a stronger model and keeps the best `top_k`. Implementations
+    receive all pairs in one call so cross-encoder models can batch their
+    forward passes.
+    """
+
+    async def rerank(
+        self,
+        query: str,
+        candidates: list[dict[str, Any]],
+        top_k: int,
+    ) -> list[dict[str, Any]]:
+        """Rerank candidate entries against the query.
+
+        Args:
+            query: The user query.
+            candidates: First-stage search results (entries with id,
+                metadata and distance, as returned by `search`).
+            top_k: Number of entries to keep.
+
+        Returns:
+            The `top_k` best candidates, most relevant first, each with a
+            `score` field set by the reranker.
+        """
+        ...
+
+
+class NaiveReranker:
+    """Embedding-similarity reranker, the `enable_rerank=false` default.
+
+    Scores each candidate by cosine similarity between the query embedding
+    and the candidate's stored vector, using the BLAS-backed kernel in
+    `_math.cosine_scores` — one matrix-vector product over all candidates
+    instead of a Python loop. Candidates must carry their vector under the
+    `"vector"` key (first-stage search can return stored vectors).
+    """
+
+    __slots__ = ("_embedder", "_assume_normalized")
+
+    def __init__(self, embedder: EmbedderProtocol, assume_normalized: bool = True):
+        """Initialize the reranker.
+
+        Args:
+            embedder: Used to embed the query.
+            assume_normalized: Set when stored vectors and query embeddings
+                are L2-normalized (the storage convention), skipping
+                per-call normalization.
+        """
+        self._embedder = embedder
+        self._assume_normalized = assume_normalized
+
+    async def rerank(
+        self,
+        query: str,
+        candidates: list[dict[str, Any]],
+        top_k: int,
+    ) -> list[dict[str, Any]]:
+        """Rerank candidates by query-candidate cosine similarity."""
+        if not candidates:
+            return []
+
+        query_vector = (await self._embedder.embed_documents_np([query]))[0]
+        matrix = np.asarray(
+            [candidate["vector"] for candidate in candidates], dtype=np.float32
+        )
+        scores = cosine_scores(query_vector, matrix, self._assume_normalized)
+
+        order = np.argsort(scores)[::-1][:top_k]
+        reranked = []
+        for i in order:
+            candidate = dict(candidates[i])
+            candidate["score"] = float(scores[i])
+            reranked.append(candidate)
+        return reranked
+
+
+def encode_vectors(
+    vectors: np.ndarray, vector_dtype: VectorDtype = "fp16"
+) -> tuple[bytes, np.ndarray | None]:
+    """Encode a float32 `[N, D]` array for transport across the IPC boundary.
+
+    Args:
+        vectors: Contiguous float32 array of shape `[N, D]` (or `[D]`).
+        vector_dtype: Target transport precision.
+
+    Returns:
+        A `(payload, scales)` tuple. `scales` is None for "fp32"/"fp16";
+        for "int8" it is the per-vector symmetric quantization scale
+        (`max(|v|) / 127`) needed to decode.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vector_dtype == "fp32":
+        return vectors.tobytes(), None
+    if vector_dtype == "fp16":
+        return vectors.astype(np.float16).tobytes(), None
+    if vector_dtype == "int8":
+        scales = np.abs(vectors).max(axis=-1, keepdims=True) / 127.0
+        scales = np.where(scales == 0.0, 1.0, scales).astype(np.float32)
+        quantized = np.round(vectors / scales).astype(np.int8)
+        return quantized.tobytes(), np.squeeze(scales, axis=-1)
+    raise ValueError(f"Unsupported vector dtype: {vector_dtype}")
+
+
+def decode_vectors(
+    payload: bytes,
+    shape: tuple[int, ...],
+    vector_dtype: VectorDtype = "fp16",
+    scales: np.ndarray | None = None,
+) -> np.ndarray:
+    """Decode a transport payload back into a float32 array.
+
+    Args:
+        payload: Bytes produced by `encode_vectors`.
+        shape: Original array shape.
+        vector_dtype: Transport precision the payload was encoded with.
+        scales: Per-vector scales returned by `encode_vectors` for "int8".
+
+    Returns:
+        A float32 array of the given shape.
+    """
+    if vector_dtype == "fp32":
+        return np.frombuffer(payload, dtype=np.float32).reshape(shape).copy()
+    if vector_dtype == "fp16":
+        return np.frombuffer(payload, dtype=np.float16).astype(np.float32).reshape(shape)
+    if vector_dtype == "int8":
+        if scales is None:
+            raise ValueError("int8 payloads require the quantization scales")
+        quantized = np.frombuffer(payload, dtype=np.int8).reshape(shape)
+        return quantized.astype(np.float32) * np.expand_dims(scales, axis=-1)
+    raise ValueError(f"Unsupported vector dtype: {vector_dtype}")
+
+
+class HostServices(abc.ABC):
+    """Bundle of host capabilities injected into `RAGEngine` instances."""
+
+    @property
+    @abc.abstractmethod
+    def embedder(self) -> EmbedderProtocol:
+        """The embedding service."""
+        ...
+
+    @property
+    @abc.abstractmethod
+    def vector_store(self) -> VectorStoreProtocol:
+        """The vector storage service."""
+        ...
+
+    @property
+    def semantic_cache(self) -> SemanticCache | None:
+        """Optional semantic query cache; None when the host disables it."""
+        return None
+
+    @property
+    def reranker(self) -> RerankerProtocol | None:
+        """Optional second-stage reranker; None when the host provides none."""
+        return None
+
+    @abc.abstractmethod
+    def open_file(
+        self, storage_path: str, *, chunk_size: int = 1 << 20
+    ) -> AsyncIterator[memoryview]:
+        """Read a file from the host storage system as zero-copy chunks.
+
+        Yields `memoryview` slices of at most `chunk_size` bytes without
+        blocking the event loop, so ingestion can overlap file reads with
+        embedding and upsert requests; feed chunks straight into the parser
+        (`parser.feed(buf)`) instead of accumulating them. Local-storage
+        hosts can delegate to `iter_local_file`.
+        """
+        ...
+
+    async def get_file_stream(self, storage_path: str) -> BinaryIO:
+        """Open a readable stream for a file in the host storage system.
+
+        .. deprecated:: Use `open_file` instead. The returned `BinaryIO`
+            forces synchronous `.read()` calls inside coroutines, blocking
+            the event loop.
+        """
+        raise NotImplementedError("Deprecated; use open_file instead.")
+
+    async def close_file_stream(self, stream: BinaryIO) -> None:
+        """Close a stream previously opened by `get_file_stream`.
+
+        .. deprecated:: Use `open_file` instead, which manages the file
+            lifetime itself.
+        """
+        raise NotImplementedError("Deprecated; use open_file instead.")
+
+    async def aclose(self) -> None:
+        """Release pooled resources (HTTP clients, store connections).
+
+        Implementations holding a pooled client from
+        `create_embedding_http_client` close it here.
+        """
+        pass
+
+    async def __aenter__(self) -> HostServices:
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+
+def chunk_id(collection_id: str, text: str, model_id: str) -> str:
+    """Derive a stable vector id from chunk content.
+
+    Hashes `(collection_id, text, model_id)` so the same chunk always maps
+    to the same id: re-ingesting a file overwrites its existing vectors
+    instead of duplicating them (and, combined with `CachingEmbedder`,
+    re-ingest costs no embedding calls), and identical chunks across
+    documents collapse into one index entry. Plugins SHOULD use this for
+    the `ids` argument of `upsert`; hosts may then short-circuit ids that
+    are already present.
+
+    Uses blake3 when installed, otherwise the stdlib blake2b.
+
+    Args:
+        collection_id: The target collection.
+        text: The chunk text.
+        model_id: The embedding model identifier (vectors from different
+            models must not collide).
+
+    Returns:
+        A 32-character hex id.
+    """
+    payload = b"\x00".join(
+        part.encode("utf-8") for part in (collection_id, text, model_id)
+    )
+    if blake3 is not None:
+        return blake3.blake3(payload).digest(16).hex()
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+async def iter_local_file(
+    path: str, chunk_size: int = 1 << 20
+) -> AsyncIterator[memoryview]:
+    """Read a local file as zero-copy chunks without blocking the event loop.
+
+    Default backing for `HostServices.open_file` when the storage backend
+    is the local filesystem.
+
+    Args:
+        path: Filesystem path to read.
+        chunk_size: Maximum bytes per yielded chunk.
+
+    Yields:
+        `memoryview` slices over the read buffers.
+    """
+    async with aiofiles.open(path, "rb") as file:
+        while True:
+            buf = await file.read(chunk_size)
+            if not buf:
+                break
+            yield memoryview(buf)
+
+
+def create_embedding_http_client(**kwargs: Any) -> httpx.AsyncClient:
+    """Create the shared, pooled HTTP client for embedding requests.
+
+    One client per `HostServices` instance serves every sub-batch spawned by
+    `BatchingEmbedderMixin`, so connections are reused across requests
+    instead of paying a TLS handshake each. HTTP/2 is enabled when the `h2`
+    package is installed, multiplexing concurrent sub-batches over a single
+    connection.
+
+    Args:
+        **kwargs: Extra arguments forwarded to `httpx.AsyncClient`
+            (e.g. `base_url`, `headers`, `timeout`).
+
+    Returns:
+        A pooled `httpx.AsyncClient`.
+    """
+    kwargs.setdefault(
+        "limits",
+        httpx.Limits(max_connections=64, max_keepalive_connections=32),
+    )
+    try:
+        return httpx.AsyncClient(http2=True, **kwargs)
+    except ImportError:
+        # h2 is not installed; keep-alive HTTP/1.1 still reuses connections.
+        return httpx.AsyncClient(**kwargs)
+
+
+class BatchingEmbedderMixin:
+    """Default micro-batching implementation for `EmbedderProtocol`.
+
+    Concrete embedders only implement `_embed_raw` (one upstream request for
+    one sub-batch); this mixin provides `embed_documents` on top of it:
+
+    1. Sort inputs by text length so each sub-batch is length-homogeneous
+       (upstream providers pad to the longest item in a batch).
+    2. Split into sub-batches of at most `max_batch_size` texts.
+    3. Dispatch sub-batches concurrently with `asyncio.gather`, capped by a
+       semaphore of `max_concurrency`.
+    4. Restore the original input order before returning.
+    """
+
+    __slots__ = ()
+
+    max_batch_size: int = 64
+    """Maximum number of texts per upstream embedding request."""
+
+    max_concurrency: int = 8
+    """Maximum number of in-flight embedding requests."""
+
+    @abc.abstractmethod
+    async def _embed_raw(self, batch: list[str]) -> list[list[float]]:
+        """Embed one sub-batch with a single upstream request."""
+        ...
+
+    def _batch_plan(self, texts: list[str]) -> list[list[int]]:
+        """Split input indices into length-sorted, size-bounded sub-batches."""
+        sorted_idx = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        return [
+            sorted_idx[offset : offset + self.max_batch_size]
+            for offset in range(0, len(sorted_idx), self.max_batch_size)
+        ]
+
+    async def embed_documents_stream(
+        self, texts: list[str]
+    ) -> AsyncIterator[tuple[list[int], list[list[float]]]]:
+        """Embed texts, yielding `(input_indices, vectors)` per sub-batch.
+
+        Sub-batches are yielded in completion order so callers can pipeline
+        downstream work (e.g. `VectorStoreProtocol.upsert_stream`) with the
+        remaining embedding requests.
+        """
+        if not texts:
+            return
+
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def _one(batch_idx: list[int]) -> tuple[list[int], list[list[float]]]:
+            async with sem:
+                return batch_idx, await self._embed_raw([texts[i] for i in batch_idx])
+
+        tasks = [asyncio.ensure_future(_one(batch)) for batch in self._batch_plan(texts)]
+        try:
+            for completed in asyncio.as_completed(tasks):
+                yield await completed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a list of texts, returning vectors in input order."""
+        vectors: list[list[float] | None] = [None] * len(texts)
+        async for batch_idx, batch_vectors in self.embed_documents_stream(texts):
+            for i, vector in zip(batch_idx, batch_vectors):
+                vectors[i] = vector
+
+        return vectors  # type: ignore[return-value]
+
+    async def embed_documents_np(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into a contiguous float32 array of shape `[N, D]`.
+
+        The default implementation converts the list result once; concrete
+        embedders that receive raw float32 buffers from their backend should
+        override this with a zero-copy `np.frombuffer(...).reshape(N, D)`.
+        """
+        return np.asarray(await self.embed_documents(texts), dtype=np.float32)
+
+
+class SemanticCache:
+    """In-memory similarity cache for retrieval responses.
+
+    Maps recent query embeddings to their `RetrievalResponse`, scoped by
+    collection. A lookup returns the cached response when the cosine
+    similarity between the new query vector and a cached one reaches the
+    threshold, skipping one embedding call and one vector search for
+    paraphrased or repeated queries. Entries expire by TTL and the cache
+    evicts least-recently-used entries per collection.
+
+    Vectors are stored L2-normalized as float32 arrays and a lookup scores
+    all eligible entries with one matrix-vector product via
+    `_math.cosine_scores`, so the scan stays cheap at the default capacity
+    — a Python-loop scan over 256 x 1024-dim entries costs ~13ms, which
+    would be paid on every miss.
+    """
+
+    __slots__ = ("_threshold", "_ttl", "_max_entries", "_collections")
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+    ):
+        """Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a cache hit.
+            ttl: Entry lifetime in seconds.
+            max_entries: Maximum cached entries per collection.
+        """
+        self._threshold = threshold
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._collections: dict[str, list[dict[str, Any]]] = {}
+
+    @staticmethod
+    def _filters_key(filters: dict[str, Any] | None) -> str:
+        return repr(sorted(filters.items())) if filters else ""
+
+    def _prune(self, entries: list[dict[str, Any]]) -> None:
+        now = time.monotonic()
+        entries[:] = [entry for entry in entries if entry["expires_at"] > now]
+        if len(entries) > self._max_entries:
+            del entries[: len(entries) - self._max_entries]
+
+    async def lookup(
+        self,
+        collection_id: str,
+        query_vector: list[float],
+        top_k: int,
+        filters: dict[str, Any] | None = None,
+    ) -> RetrievalResponse | None:
+        """Look up a cached response for a semantically similar query.
+
+        Returns:
+            The cached response, or None when no entry is similar enough.
+        """
+        entries = self._collections.get(collection_id)
+        if not entries:
+            return None
+        self._prune(entries)
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query_norm = float(np.linalg.norm(query))
+        if query_norm == 0.0:
+            return None
+
+        filters_key = self._filters_key(filters)
+        eligible = [
+            entry
+            for entry in entries
+            if entry["top_k"] == top_k and entry["filters_key"] == filters_key
+        ]
+        if not eligible:
+            return None
+
+        # Stored vectors are unit-normalized, so one BLAS matrix-vector
+        # product scores every eligible entry at once.
+        scores = cosine_scores(
+            query / query_norm,
+            np.stack([entry["vector"] for entry in eligible]),
+            assume_normalized=True,
+        )
+        best_index = int(np.argmax(scores))
+        if float(scores[best_index]) < self._threshold:
+            return None
+        best = eligible[best_index]
+
+        # LRU: refresh the hit entry's position.
+        entries.remove(best)
+        entries.append(best)
+        return best["response"]
+
+    async def store(
+        self,
+        collection_id: str,
+        query_vector: list[float],
+        top_k: int,
+        response: RetrievalResponse,
+        filters: dict[str, Any] | None = None,
+    ) -> None:
+        """Cache a retrieval response under its query embedding."""
+        vector = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return
+        entries = self._collections.setdefault(collection_id, [])
+        entries.append(
+            {
+                "vector": vector / norm,
+                "top_k": top_k,
+                "filters_key": self._filters_key(filters),
+                "response": response,
+                "expires_at": time.monotonic() + self._ttl,
+            }
+        )
+        self._prune(entries)
+
+    async def invalidate(self, collection_id: str) -> None:
+        """Drop all cached responses for a collection.
+
+        Hosts call this on `upsert`/`delete` so stale results are never
+        served after the collection changes.
+        """
+        self._collections.pop(collection_id, None)
+
+
+class CachingEmbedder:
+    """Embedder wrapper with a persistent content-hash cache.
+
+    Vectors are keyed by `(model_id, sha256(text))` in a local SQLite
+    database plus an in-process LRU, so identical chunks — re-ingested
+    documents, duplicated boilerplate across files — skip the embedding
+    network call entirely. The wrapper is itself an `EmbedderProtocol` and
+    delegates misses to the inner embedder.
+    """
+
+    __slots__ = ("_inner", "_cache_size", "_lru", "_db", "hits", "misses")
+
+    def __init__(
+        self,
+        inner: EmbedderProtocol,
+        cache_dir: str,
+        cache_size: int = 4096,
+    ):
+        """Initialize the caching embedder.
+
+        Args:
+            inner: The embedder to delegate cache misses to.
+            cache_dir: Directory holding the persistent cache database.
+            cache_size: Maximum number of vectors kept in the in-process LRU.
+        """
+        self._inner = inner
+        self._cache_size = cache_size
+        self._lru: collections.OrderedDict[bytes, list[float]] = collections.OrderedDict()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(cache_dir, "embeddings.db"))
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model_id TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model_id, key))"
+        )
+        self._db.commit()
+
+        self.hits = 0
+        """Number of texts served from the cache."""
+
+        self.misses = 0
+        """Number of texts that required an upstream embedding call."""
+
+    @property
+    def model_id(self) -> str:
+        return self._inner.model_id
+
+    @property
+    def max_batch_size(self) -> int:
+        return self._inner.max_batch_size
+
+    @property
+    def max_concurrency(self) -> int:
+        return self._inner.max_concurrency
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of texts served from the cache so far."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lru_get(self, key: bytes) -> list[float] | None:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+        return vector
+
+    def _lru_put(self, key: bytes, vector: list[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self._cache_size:
+            self._lru.popitem(last=False)
+
+    _DB_BATCH_SIZE = 500
+    """Keys per `IN (...)` query, bounded well below SQLITE_MAX_VARIABLE_NUMBER
+    (999 on older builds)."""
+
+    def _db_get_many(self, keys: list[bytes]) -> dict[bytes, list[float]]:
+        found: dict[bytes, list[float]] = {}
+        for start in range(0, len(keys), self._DB_BATCH_SIZE):
+            batch = keys[start : start + self._DB_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE model_id = ? AND key IN ({placeholders})",
+                [self.model_id, *batch],
+            )
+            for key, blob in rows:
+                vector = array.array("f")
+                vector.frombytes(blob)
+                found[bytes(key)] = vector.tolist()
+        return found
+
+    def _db_put_many(self, items: list[tuple[bytes, list[float]]]) -> None:
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embeddings (model_id, key, vector) VALUES (?, ?, ?)",
+            [
+                (self.model_id, key, array.array("f", vector).tobytes())
+                for key, vector in items
+            ],
+        )
+        self._db.commit()
+
+    async def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, serving repeated content from the cache."""
+        if not texts:
+            return []
+
+        keys = [hashlib.sha256(text.encode("utf-8")).digest() for text in texts]
+        vectors: dict[bytes, list[float]] = {}
+
+        for key in keys:
+            if key not in vectors:
+                cached = self._lru_get(key)
+                if cached is not None:
+                    vectors[key] = cached
+
+        db_lookup = [key for key in set(keys) if key not in vectors]
+        if db_lookup:
+            for key, vector in self._db_get_many(db_lookup).items():
+                vectors[key] = vector
+                self._lru_put(key, vector)
+
+        miss_keys: list[bytes] = []
+        miss_texts: list[str] = []
+        seen_misses: set[bytes] = set()
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in seen_misses:
+                seen_misses.add(key)
+                miss_keys.append(key)
+                miss_texts.append(text)
+
+        self.hits += len(texts) - len(miss_texts)
+        self.misses += len(miss_texts)
+
+        if miss_texts:
+            embedded = await self._inner.embed_documents(miss_texts)
+            for key, vector in zip(miss_keys, embedded):
+                vectors[key] = vector
+                self._lru_put(key, vector)
+            self._db_put_many(list(zip(miss_keys, embedded)))
+
+        return [vectors[key] for key in keys]
+
+    async def embed_documents_stream(
+        self, texts: list[str]
+    ) -> AsyncIterator[tuple[list[int], list[list[float]]]]:
+        """Embed texts, yielding one batch once cache misses are resolved."""
+        if not texts:
+            return
+        yield list(range(len(texts))), await self.embed_documents(texts)
+
+    async def embed_documents_np(self, texts: list[str]) -> np.ndarray:
+        """Embed texts into a contiguous float32 array, serving from the cache."""
+        return np.asarray(await self.embed_documents(texts), dtype=np.float32)
+
+    async def submit_embed_batch(
+        self,
+        texts: list[str],
+        collection_id: str,
+        chunk_ids: list[str],
+    ) -> BatchHandle:
+        """Submit an asynchronous batch job via the inner embedder.
+
+        Batch jobs bypass the cache: the provider returns vectors hours
+        later and the host upserts them directly, so there is nothing to
+        serve or record here.
+        """
+        return await self._inner.submit_embed_batch(texts, collection_id, chunk_ids)
+
+    async def poll_embed_batch(
+        self, handle: BatchHandle
+    ) -> list[list[float]] | PendingStatus:
+        """Poll an asynchronous batch job via the inner embedder."""
+        return await self._inner.poll_embed_batch(handle)
+
+    def close(self) -> None:
+        """Close the persistent cache database."""
+        self._db.close()
+
+
+async def stream_ingest(
+    services: HostServices,
+    collection_id: str,
+    ids: list[str],
+    texts: list[str],
+    metadatas: list[dict[str, Any]],
+) -> int:
+    """Embed texts and upsert them as a pipeline, batch by batch.
+
+    Embedding sub-batches flow into `VectorStoreProtocol.upsert_stream` as
+    they complete, overlapping the two network-bound stages and keeping
+    memory at one batch of vectors instead of the whole document.
+
+    Args:
+        services: The host services bundle.
+        collection_id: Target vector collection.
+        ids: Vector ids, parallel to `texts`.
+        texts: Chunk texts to embed.
+        metadatas: Vector metadatas, parallel to `texts`.
+
+    Returns:
+        The number of vectors written.
+    """
+
+    async def _stream() -> AsyncIterator[
+        tuple[list[str], list[list[float]], list[dict[str, Any]]]
+    ]:
+        async for batch_idx, batch_vectors in services.embedder.embed_documents_stream(
+            texts
+        ):
+            yield (
+                [ids[i] for i in batch_idx],
+                batch_vectors,
+                [metadatas[i] for i in batch_idx],
+            )
+
+    await services.vector_store.upsert_stream(collection_id, _stream())
+    return len(texts)
+
+
+async def ingest_pipeline(
+    services: HostServices,
+    collection_id: str,
+    file_stream: AsyncIterator[memoryview],
+    chunker: Callable[[AsyncIterator[memoryview]], AsyncIterator[TextChunk]],
+    embed_batch: int = 64,
+    queue_depth: int = 128,
+) -> int:
+    """Run parse/chunk, embed and upsert as three concurrent pipeline stages.
+
+    The chunker consumes the file stream and produces chunks into a bounded
+    queue; an embed worker batches them into `embed_documents_np` calls; an
+    upsert worker writes each embedded batch with `upsert_np`. CPU-bound
+    parsing overlaps the two network-bound stages, and the bounded queues
+    provide backpressure so peak memory stays at O(queue_depth) chunks
+    instead of the whole document.
+
+    Args:
+        services: The host services bundle.
+        collection_id: Target vector collection.
+        file_stream: Chunked file content, e.g. from `HostServices.open_file`.
+        chunker: Turns the byte stream into an async iterator of `TextChunk`.
+        embed_batch: Chunks per embedding request; embedded batches are also
+            the upsert write unit.
+        queue_depth: Maximum chunks buffered between chunker and embedder.
+
+    Returns:
+        The number of vectors written.
+    """
+    chunk_q: asyncio.Queue[TextChunk | None] = asyncio.Queue(maxsize=queue_depth)
+    vec_q: asyncio.Queue[tuple[list[TextChunk], np.ndarray] | None] = asyncio.Queue(
+        maxsize=max(1, queue_depth // embed_batch)
+    )
+    total = 0
+
+    async def produce_chunks() -> None:
+        async for chunk in chunker(file_stream):
+            await chunk_q.put(chunk)
+        await chunk_q.put(None)
+
+    async def embed_worker() -> None:
+        batch: list[TextChunk] = []
+        while True:
+            item = await chunk_q.get()
+            finished = item is None
+            if not finished:
+                batch.append(item)
+            if batch and (finished or len(batch) >= embed_batch):
+                vectors = await services.embedder.embed_documents_np(
+                    [chunk.text for chunk in batch]
+                )
+                await vec_q.put((batch, vectors))
+                batch = []
+            if finished:
+                break
+        await vec_q.put(None)
+
+    async def upsert_worker() -> None:
+        nonlocal total
+        while True:
+            item = await vec_q.get()
+            if item is None:
+                break
+            batch, vectors = item
+            await services.vector_store.upsert_np(
+                collection_id,
+                [chunk.chunk_id for chunk in batch],
+                vectors,
+                [
+                    {**chunk.metadata, "document_id": chunk.document_id}
+                    for chunk in batch
+                ],
+            )
+            total += len(batch)
+
+    tasks = [
+        asyncio.ensure_future(produce_chunks()),
+        asyncio.ensure_future(embed_worker()),
+        asyncio.ensure_future(upsert_worker()),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return total
+
+
+async def bulk_upsert(
+    services: HostServices,
+    collection_id: str,
+    chunks: list[TextChunk],
+    max_batch_chunks: int = 512,
+    max_batch_bytes: int = 4 << 20,
+) -> int:
+    """Embed and upsert all chunks of a document in few, large batches.
+
+    Collapses the naive per-chunk flow (one embed call and one upsert
+    round-trip per chunk) into one `embed_documents_np` plus one
+    `upsert_np` per size-bounded batch. Batches are cut at
+    `max_batch_chunks` chunks or roughly `max_batch_bytes` of text,
+    whichever comes first.
+
+    Each vector's metadata is the chunk metadata plus its `document_id`,
+    so documents stay deletable via `delete(filters=...)`.
+
+    Args:
+        services: The host services bundle.
+        collection_id: Target vector collection.
+        chunks: All chunks of the document.
+        max_batch_chunks: Maximum number of chunks per batch.
+        max_batch_bytes: Approximate maximum text payload per batch.
+
+    Returns:
+        The number of vectors written.
+    """
+    batch: list[TextChunk] = []
+    batch_bytes = 0
+
+    async def _flush() -> None:
+        nonlocal batch, batch_bytes
+        if not batch:
+            return
+        vectors = await services.embedder.embed_documents_np(
+            [chunk.text for chunk in batch]
+        )
+        await services.vector_store.upsert_np(
+            collection_id,
+            [chunk.chunk_id for chunk in batch],
+            vectors,
+            [
+                {**chunk.metadata, "document_id": chunk.document_id}
+                for chunk in batch
+            ],
+        )
+        batch = []
+        batch_bytes = 0
+
+    for chunk in chunks:
+        batch.append(chunk)
+        batch_bytes += len(chunk.text.encode("utf-8"))
+        if len(batch) >= max_batch_chunks or batch_bytes >= max_batch_bytes:
+            await _flush()
+    await _flush()
+
+    return len(chunks)
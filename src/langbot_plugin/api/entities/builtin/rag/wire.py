@@ -0,0 +1,131 @@
+"""msgspec wire-format mirrors of the hot-path RAG entities.
+
+`RetrievalContext`, `IngestionContext` and `RetrievalResultEntry` cross the
+plugin<->host boundary on every user turn; decoding them into pydantic
+models dominates the per-call overhead of short RAG operations. The structs
+here decode straight from msgpack bytes with no intermediate dicts, and are
+frozen and array-keyed for compactness.
+
+The pydantic models in `rag.context` / `rag.models` remain the canonical,
+validated entities; use `to_pydantic()` / `from_pydantic()` at the edges
+where validation or existing APIs are needed. Importing this module
+requires `msgspec` (install the `wire` extra).
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+import msgspec
+
+from langbot_plugin.api.entities.builtin.rag import context as rag_context
+from langbot_plugin.api.entities.builtin.rag import models as rag_models
+
+
+class RetrievalResultEntry(msgspec.Struct, frozen=True, array_like=True):
+    """Wire mirror of `rag.context.RetrievalResultEntry`."""
+
+    id: str
+    content: list[dict[str, Any]]
+    """ContentElement payloads as plain dicts."""
+    metadata: dict[str, Any]
+    distance: float
+    score: float | None = None
+
+    def to_pydantic(self) -> rag_context.RetrievalResultEntry:
+        """Convert to the validated pydantic entity."""
+        return rag_context.RetrievalResultEntry.model_validate(msgspec.structs.asdict(self))
+
+    @classmethod
+    def from_pydantic(
+        cls, entry: rag_context.RetrievalResultEntry
+    ) -> RetrievalResultEntry:
+        """Build the wire struct from the pydantic entity."""
+        return cls(
+            id=entry.id,
+            content=[element.model_dump(mode="json") for element in entry.content],
+            metadata=entry.metadata,
+            distance=entry.distance,
+            score=entry.score,
+        )
+
+
+class RetrievalContext(msgspec.Struct, frozen=True, array_like=True):
+    """Wire mirror of `rag.context.RetrievalContext`."""
+
+    query: str
+    top_k: int = 5
+    knowledge_base_id: str | None = None
+    collection_id: str | None = None
+    retrieval_settings: dict[str, Any] = msgspec.field(default_factory=dict)
+    creation_settings: dict[str, Any] = msgspec.field(default_factory=dict)
+    filters: dict[str, Any] = msgspec.field(default_factory=dict)
+
+    def get_collection_id(self) -> str:
+        """Get the collection ID, falling back to knowledge_base_id."""
+        return self.collection_id or self.knowledge_base_id or ""
+
+    def to_pydantic(self) -> rag_context.RetrievalContext:
+        """Convert to the validated pydantic entity."""
+        return rag_context.RetrievalContext.model_validate(msgspec.structs.asdict(self))
+
+    @classmethod
+    def from_pydantic(cls, context: rag_context.RetrievalContext) -> RetrievalContext:
+        """Build the wire struct from the pydantic entity."""
+        return cls(**context.model_dump())
+
+
+class IngestionContext(msgspec.Struct, frozen=True, array_like=True):
+    """Wire mirror of `rag.models.IngestionContext`."""
+
+    file_object: dict[str, Any]
+    """FileObject payload as a plain dict."""
+    knowledge_base_id: str
+    collection_id: str | None = None
+    creation_settings: dict[str, Any] = msgspec.field(default_factory=dict)
+    async_batch: bool = False
+
+    def get_collection_id(self) -> str:
+        """Get the collection ID, falling back to knowledge_base_id."""
+        return self.collection_id or self.knowledge_base_id
+
+    def to_pydantic(self) -> rag_models.IngestionContext:
+        """Convert to the validated pydantic entity."""
+        return rag_models.IngestionContext.model_validate(msgspec.structs.asdict(self))
+
+    @classmethod
+    def from_pydantic(cls, context: rag_models.IngestionContext) -> IngestionContext:
+        """Build the wire struct from the pydantic entity."""
+        return cls(
+            file_object=context.file_object.model_dump(mode="json"),
+            knowledge_base_id=context.knowledge_base_id,
+            collection_id=context.collection_id,
+            creation_settings=context.creation_settings,
+            async_batch=context.async_batch,
+        )
+
+
+_encoder = msgspec.msgpack.Encoder()
+_retrieval_context_decoder = msgspec.msgpack.Decoder(RetrievalContext)
+_ingestion_context_decoder = msgspec.msgpack.Decoder(IngestionContext)
+_result_entries_decoder = msgspec.msgpack.Decoder(list[RetrievalResultEntry])
+
+
+def encode(obj: Any) -> bytes:
+    """Encode a wire struct (or list of them) to msgpack bytes."""
+    return _encoder.encode(obj)
+
+
+def decode_retrieval_context(buf: bytes) -> RetrievalContext:
+    """Decode a `RetrievalContext` from msgpack bytes, zero intermediate dicts."""
+    return _retrieval_context_decoder.decode(buf)
+
+
+def decode_ingestion_context(buf: bytes) -> IngestionContext:
+    """Decode an `IngestionContext` from msgpack bytes."""
+    return _ingestion_context_decoder.decode(buf)
+
+
+def decode_result_entries(buf: bytes) -> list[RetrievalResultEntry]:
+    """Decode a list of `RetrievalResultEntry` from msgpack bytes."""
+    return _result_entries_decoder.decode(buf)
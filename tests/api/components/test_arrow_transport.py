@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+
+from langbot_plugin.api.definition.components.rag_engine._arrow import (  # noqa: E402
+    decode_search_results,
+    decode_vector_batch,
+    encode_search_results,
+    encode_vector_batch,
+)
+
+
+def test_vector_batch_round_trip():
+    """id 与向量经 Arrow IPC 往返后保持不变"""
+    ids = [f"chunk-{n}" for n in range(5)]
+    vectors = np.arange(20, dtype=np.float32).reshape(5, 4)
+
+    decoded_ids, decoded = decode_vector_batch(encode_vector_batch(ids, vectors))
+
+    assert decoded_ids == ids
+    assert decoded.dtype == np.float32
+    assert decoded.shape == (5, 4)
+    np.testing.assert_array_equal(decoded, vectors)
+
+
+def test_decode_vector_batch_is_zero_copy():
+    """解码得到的数组是 IPC 缓冲区上的视图，不拥有数据"""
+    vectors = np.ones((3, 8), dtype=np.float32)
+    _, decoded = decode_vector_batch(encode_vector_batch(["a", "b", "c"], vectors))
+    assert not decoded.flags.owndata
+
+
+def test_search_results_round_trip():
+    """检索结果的 id/distance/score/metadata 经往返后保持不变"""
+    entries = [
+        {
+            "id": "chunk-1",
+            "distance": 0.1,
+            "score": 0.9,
+            "metadata": {"document_id": "doc-1", "pos": 0},
+        },
+        {"id": "chunk-2", "distance": 0.4, "metadata": {}},
+    ]
+
+    decoded = decode_search_results(encode_search_results(entries))
+
+    assert [entry["id"] for entry in decoded] == ["chunk-1", "chunk-2"]
+    assert decoded[0]["distance"] == pytest.approx(0.1)
+    assert decoded[0]["score"] == pytest.approx(0.9)
+    assert decoded[0]["metadata"] == {"document_id": "doc-1", "pos": 0}
+    # 未经过重排的一阶段结果没有 score
+    assert decoded[1]["distance"] == pytest.approx(0.4)
+    assert decoded[1]["score"] is None
+    assert decoded[1]["metadata"] == {}
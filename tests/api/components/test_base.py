@@ -0,0 +1,26 @@
+import pytest
+
+from langbot_plugin.api.definition.components.base import PolymorphicComponent
+from langbot_plugin.api.definition.components.knowledge_retriever.retriever import (
+    KnowledgeRetriever,
+)
+from langbot_plugin.api.definition.components.rag_engine.engine import RAGEngine
+
+
+def test_kind_registry_resolves_base_classes():
+    assert PolymorphicComponent.get_kind_class("KnowledgeRetriever") is KnowledgeRetriever
+    assert PolymorphicComponent.get_kind_class("RAGEngine") is RAGEngine
+
+
+def test_plugin_subclasses_do_not_re_register():
+    class MyRetriever(KnowledgeRetriever):
+        async def retrieve(self, context):
+            return []
+
+    # 插件子类继承 __kind__，注册表仍指向基类
+    assert PolymorphicComponent.get_kind_class("KnowledgeRetriever") is KnowledgeRetriever
+
+
+def test_unknown_kind_raises_key_error():
+    with pytest.raises(KeyError):
+        PolymorphicComponent.get_kind_class("NoSuchKind")
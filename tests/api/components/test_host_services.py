@@ -0,0 +1,460 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+from langbot_plugin.api.definition.components.rag_engine.host_services import (
+    BatchHandle,
+    BatchingEmbedderMixin,
+    CachingEmbedder,
+    EmbedderProtocol,
+    NaiveReranker,
+    PendingStatus,
+    RerankerProtocol,
+    SemanticCache,
+    bulk_upsert,
+    chunk_id,
+    create_embedding_http_client,
+    decode_vectors,
+    encode_vectors,
+    ingest_pipeline,
+    iter_local_file,
+    stream_ingest,
+)
+from langbot_plugin.api.definition.components.rag_engine._math import cosine_scores
+from langbot_plugin.api.entities.builtin.rag.context import RetrievalResponse
+from langbot_plugin.api.entities.builtin.rag.models import TextChunk
+
+
+class FakeEmbedder(BatchingEmbedderMixin):
+    """Embedder that records batches and returns length-derived vectors."""
+
+    max_batch_size = 4
+    max_concurrency = 2
+
+    def __init__(self):
+        self.batches = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _embed_raw(self, batch):
+        self.batches.append(batch)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return [[float(len(text))] for text in batch]
+
+
+def test_embed_documents_preserves_input_order():
+    """结果必须按输入顺序返回，即使内部按长度重排"""
+    texts = ["ccc", "a", "bb", "dddd", "ee", "f"]
+    embedder = FakeEmbedder()
+    vectors = asyncio.run(embedder.embed_documents(texts))
+    assert vectors == [[float(len(text))] for text in texts]
+
+
+def test_embed_documents_batches_are_length_sorted_and_bounded():
+    """子批按长度排序且不超过 max_batch_size"""
+    texts = ["x" * n for n in [5, 1, 3, 2, 4, 6, 8, 7, 9]]
+    embedder = FakeEmbedder()
+    asyncio.run(embedder.embed_documents(texts))
+
+    flattened = [text for batch in embedder.batches for text in batch]
+    assert flattened == sorted(texts, key=len)
+    assert all(len(batch) <= FakeEmbedder.max_batch_size for batch in embedder.batches)
+
+
+def test_embed_documents_respects_max_concurrency():
+    """并发子批数量不超过 max_concurrency"""
+    texts = ["x" * n for n in range(1, 33)]
+    embedder = FakeEmbedder()
+    asyncio.run(embedder.embed_documents(texts))
+    assert embedder.max_in_flight <= FakeEmbedder.max_concurrency
+
+
+def test_embed_documents_empty_input():
+    embedder = FakeEmbedder()
+    assert asyncio.run(embedder.embed_documents([])) == []
+    assert embedder.batches == []
+
+
+def test_embed_documents_stream_covers_all_inputs():
+    """流式接口按完成顺序产出，所有下标恰好覆盖一次"""
+    texts = ["x" * n for n in range(1, 11)]
+    embedder = FakeEmbedder()
+
+    async def collect():
+        seen = []
+        async for batch_idx, batch_vectors in embedder.embed_documents_stream(texts):
+            assert len(batch_idx) == len(batch_vectors)
+            seen.extend(batch_idx)
+        return seen
+
+    seen = asyncio.run(collect())
+    assert sorted(seen) == list(range(len(texts)))
+
+
+def test_embed_documents_np_shape_and_dtype():
+    texts = ["a", "bb", "ccc"]
+    embedder = FakeEmbedder()
+    arr = asyncio.run(embedder.embed_documents_np(texts))
+    assert isinstance(arr, np.ndarray)
+    assert arr.dtype == np.float32
+    assert arr.shape == (3, 1)
+    assert arr[:, 0].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_caching_embedder_skips_repeated_content(tmp_path):
+    """相同文本只调用一次内层 embedder"""
+    inner = FakeEmbedder()
+    inner.model_id = "test-model"
+    cached = CachingEmbedder(inner, str(tmp_path), cache_size=16)
+
+    texts = ["aaa", "bb", "aaa", "c"]
+    first = asyncio.run(cached.embed_documents(texts))
+    assert first == [[3.0], [2.0], [3.0], [1.0]]
+    assert cached.misses == 3  # "aaa" deduplicated within the call
+
+    inner.batches.clear()
+    second = asyncio.run(cached.embed_documents(texts))
+    assert second == first
+    assert inner.batches == []
+    assert cached.hit_rate > 0.5
+    cached.close()
+
+
+def test_caching_embedder_persists_across_instances(tmp_path):
+    inner = FakeEmbedder()
+    inner.model_id = "test-model"
+    cached = CachingEmbedder(inner, str(tmp_path))
+    asyncio.run(cached.embed_documents(["hello", "world"]))
+    cached.close()
+
+    inner2 = FakeEmbedder()
+    inner2.model_id = "test-model"
+    cached2 = CachingEmbedder(inner2, str(tmp_path))
+    vectors = asyncio.run(cached2.embed_documents(["hello", "world"]))
+    assert vectors == [[5.0], [5.0]]
+    assert inner2.batches == []
+    cached2.close()
+
+
+def test_vector_transport_round_trip():
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((8, 16)).astype(np.float32)
+    # 归一化，符合协议对量化误差的约定
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    payload, scales = encode_vectors(vectors, "fp32")
+    assert scales is None
+    np.testing.assert_array_equal(decode_vectors(payload, vectors.shape, "fp32"), vectors)
+
+    payload, scales = encode_vectors(vectors, "fp16")
+    assert len(payload) == vectors.nbytes // 2
+    np.testing.assert_allclose(
+        decode_vectors(payload, vectors.shape, "fp16"), vectors, atol=1e-3
+    )
+
+    payload, scales = encode_vectors(vectors, "int8")
+    assert len(payload) == vectors.nbytes // 4
+    assert scales.shape == (8,)
+    np.testing.assert_allclose(
+        decode_vectors(payload, vectors.shape, "int8", scales), vectors, atol=1e-2
+    )
+
+
+def test_vector_transport_int8_zero_vector():
+    vectors = np.zeros((2, 4), dtype=np.float32)
+    payload, scales = encode_vectors(vectors, "int8")
+    np.testing.assert_array_equal(
+        decode_vectors(payload, vectors.shape, "int8", scales), vectors
+    )
+
+
+def test_cosine_scores_matches_definition():
+    q = np.array([3.0, 4.0], dtype=np.float32)
+    M = np.array([[3.0, 4.0], [4.0, -3.0], [0.0, 0.0]], dtype=np.float32)
+    scores = cosine_scores(q, M)
+    np.testing.assert_allclose(scores, [1.0, 0.0, 0.0], atol=1e-6)
+
+    # 归一化输入走单次矩阵乘法路径，结果一致
+    qn = q / np.linalg.norm(q)
+    Mn = M[:2] / np.linalg.norm(M[:2], axis=1, keepdims=True)
+    np.testing.assert_allclose(
+        cosine_scores(qn, Mn, assume_normalized=True), [1.0, 0.0], atol=1e-6
+    )
+
+
+def test_naive_reranker_orders_by_similarity():
+    class TableEmbedder:
+        vectors = {"query": [1.0, 0.0]}
+
+        async def embed_documents_np(self, texts):
+            return np.asarray([self.vectors[t] for t in texts], dtype=np.float32)
+
+    candidates = [
+        {"id": "far", "vector": [0.0, 1.0]},
+        {"id": "near", "vector": [1.0, 0.0]},
+        {"id": "mid", "vector": [0.7071, 0.7071]},
+    ]
+
+    reranker = NaiveReranker(TableEmbedder())
+    top = asyncio.run(reranker.rerank("query", candidates, top_k=2))
+
+    assert [entry["id"] for entry in top] == ["near", "mid"]
+    assert top[0]["score"] >= top[1]["score"]
+    # 原 candidates 不被就地修改
+    assert "score" not in candidates[1]
+
+
+def test_chunk_id_is_stable_and_scoped():
+    first = chunk_id("kb-1", "hello world", "model-a")
+    assert first == chunk_id("kb-1", "hello world", "model-a")
+    assert len(first) == 32
+    # 任一维度变化都必须产生不同 id
+    assert first != chunk_id("kb-2", "hello world", "model-a")
+    assert first != chunk_id("kb-1", "hello world!", "model-a")
+    assert first != chunk_id("kb-1", "hello world", "model-b")
+    # 字段边界不能歧义拼接
+    assert chunk_id("a", "bc", "d") != chunk_id("ab", "c", "d")
+
+
+def test_create_embedding_http_client_is_pooled():
+    async def run():
+        client = create_embedding_http_client()
+        try:
+            assert isinstance(client, httpx.AsyncClient)
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+
+
+def test_iter_local_file_yields_memoryview_chunks(tmp_path):
+    path = tmp_path / "doc.bin"
+    data = bytes(range(256)) * 40
+    path.write_bytes(data)
+
+    async def collect():
+        chunks = []
+        async for buf in iter_local_file(str(path), chunk_size=4096):
+            assert isinstance(buf, memoryview)
+            assert len(buf) <= 4096
+            chunks.append(bytes(buf))
+        return b"".join(chunks)
+
+    assert asyncio.run(collect()) == data
+
+
+def test_bulk_upsert_collapses_round_trips():
+    class FakeServices:
+        def __init__(self):
+            self.embedder = FakeEmbedder()
+            self.vector_store = self
+            self.upserts = []
+
+        async def upsert_np(self, collection_id, ids, vectors, metadatas, vector_dtype="fp16"):
+            self.upserts.append((collection_id, ids, vectors, metadatas))
+
+    chunks = [
+        TextChunk(text=f"chunk {n}", chunk_id=f"c{n}", document_id="doc-1")
+        for n in range(10)
+    ]
+
+    services = FakeServices()
+    count = asyncio.run(bulk_upsert(services, "kb-1", chunks, max_batch_chunks=4))
+
+    assert count == 10
+    # 10 chunks / 4 per batch -> 3 次 upsert，而不是 10 次
+    assert len(services.upserts) == 3
+    all_ids = [id_ for _, ids, _, _ in services.upserts for id_ in ids]
+    assert all_ids == [f"c{n}" for n in range(10)]
+    for _, _, _, metadatas in services.upserts:
+        assert all(metadata["document_id"] == "doc-1" for metadata in metadatas)
+
+
+def test_ingest_pipeline_runs_all_stages():
+    class FakeServices:
+        def __init__(self):
+            self.embedder = FakeEmbedder()
+            self.vector_store = self
+            self.upserts = []
+
+        async def upsert_np(self, collection_id, ids, vectors, metadatas, vector_dtype="fp16"):
+            self.upserts.append(ids)
+
+    async def byte_stream():
+        for n in range(5):
+            yield memoryview(f"line {n}\n".encode())
+
+    async def chunker(stream):
+        n = 0
+        async for buf in stream:
+            yield TextChunk(text=bytes(buf).decode(), chunk_id=f"c{n}", document_id="doc-1")
+            n += 1
+
+    services = FakeServices()
+    count = asyncio.run(
+        ingest_pipeline(services, "kb-1", byte_stream(), chunker, embed_batch=2)
+    )
+
+    assert count == 5
+    written = [id_ for ids in services.upserts for id_ in ids]
+    assert written == [f"c{n}" for n in range(5)]
+    # 5 chunks / embed_batch=2 -> 3 个批次
+    assert len(services.upserts) == 3
+
+
+def test_semantic_cache_hits_on_similar_query():
+    cache = SemanticCache(threshold=0.95)
+    response = RetrievalResponse(results=[], total_found=0)
+
+    async def run():
+        await cache.store("kb-1", [1.0, 0.0], 5, response)
+        hit = await cache.lookup("kb-1", [0.999, 0.01], 5, None)
+        miss_direction = await cache.lookup("kb-1", [0.0, 1.0], 5, None)
+        miss_top_k = await cache.lookup("kb-1", [1.0, 0.0], 3, None)
+        miss_collection = await cache.lookup("kb-2", [1.0, 0.0], 5, None)
+        return hit, miss_direction, miss_top_k, miss_collection
+
+    hit, miss_direction, miss_top_k, miss_collection = asyncio.run(run())
+    assert hit is response
+    assert miss_direction is None
+    assert miss_top_k is None
+    assert miss_collection is None
+
+
+def test_semantic_cache_invalidate_and_ttl():
+    cache = SemanticCache(threshold=0.9, ttl=0.0)
+    response = RetrievalResponse(results=[], total_found=0)
+
+    async def run():
+        await cache.store("kb-1", [1.0, 0.0], 5, response)
+        expired = await cache.lookup("kb-1", [1.0, 0.0], 5, None)
+
+        fresh_cache = SemanticCache(threshold=0.9)
+        await fresh_cache.store("kb-1", [1.0, 0.0], 5, response)
+        await fresh_cache.invalidate("kb-1")
+        invalidated = await fresh_cache.lookup("kb-1", [1.0, 0.0], 5, None)
+        return expired, invalidated
+
+    expired, invalidated = asyncio.run(run())
+    assert expired is None
+    assert invalidated is None
+
+
+def test_stream_ingest_pipelines_batches_into_store():
+    class FakeServices:
+        def __init__(self):
+            self.embedder = FakeEmbedder()
+            self.vector_store = self
+
+        async def upsert_stream(self, collection_id, stream):
+            self.collection_id = collection_id
+            self.written = {}
+            async for ids, vectors, metadatas in stream:
+                for id_, vector, metadata in zip(ids, vectors, metadatas):
+                    self.written[id_] = (vector, metadata)
+
+    texts = ["x" * n for n in range(1, 10)]
+    ids = [f"chunk-{n}" for n in range(len(texts))]
+    metadatas = [{"pos": n} for n in range(len(texts))]
+
+    services = FakeServices()
+    count = asyncio.run(stream_ingest(services, "kb-1", ids, texts, metadatas))
+
+    assert count == len(texts)
+    assert services.collection_id == "kb-1"
+    assert set(services.written) == set(ids)
+    for n, id_ in enumerate(ids):
+        assert services.written[id_] == ([float(len(texts[n]))], {"pos": n})
+
+
+def test_protocols_are_runtime_checkable():
+    """协议可用 isinstance 检查，缺少成员的对象不通过"""
+
+    class CompleteEmbedder:
+        model_id = "m"
+        max_batch_size = 4
+        max_concurrency = 2
+
+        async def embed_documents(self, texts):
+            return []
+
+        def embed_documents_stream(self, texts):
+            raise NotImplementedError
+
+        async def embed_documents_np(self, texts):
+            raise NotImplementedError
+
+        async def submit_embed_batch(self, texts, collection_id, chunk_ids):
+            raise NotImplementedError
+
+        async def poll_embed_batch(self, handle):
+            raise NotImplementedError
+
+    assert isinstance(CompleteEmbedder(), EmbedderProtocol)
+    # FakeEmbedder 缺 model_id 与批量任务方法
+    assert not isinstance(FakeEmbedder(), EmbedderProtocol)
+    assert isinstance(NaiveReranker(FakeEmbedder()), RerankerProtocol)
+
+
+def test_concrete_helpers_declare_slots():
+    """具体辅助类声明 __slots__，实例不带 __dict__"""
+    reranker = NaiveReranker(FakeEmbedder())
+    cache = SemanticCache()
+    assert not hasattr(reranker, "__dict__")
+    assert not hasattr(cache, "__dict__")
+
+
+def test_caching_embedder_delegates_batch_jobs(tmp_path):
+    """包装器满足 EmbedderProtocol 并把批量任务转发给内层 embedder"""
+
+    class BatchFakeEmbedder(FakeEmbedder):
+        model_id = "test-model"
+
+        async def submit_embed_batch(self, texts, collection_id, chunk_ids):
+            self.submitted = (texts, collection_id, chunk_ids)
+            return BatchHandle(
+                provider_batch_id="job-1",
+                collection_id=collection_id,
+                chunk_ids=chunk_ids,
+            )
+
+        async def poll_embed_batch(self, handle):
+            return PendingStatus(status="in_progress")
+
+    inner = BatchFakeEmbedder()
+    cached = CachingEmbedder(inner, str(tmp_path))
+    assert isinstance(cached, EmbedderProtocol)
+
+    async def run():
+        handle = await cached.submit_embed_batch(["a"], "kb-1", ["chunk-1"])
+        return handle, await cached.poll_embed_batch(handle)
+
+    handle, status = asyncio.run(run())
+    assert inner.submitted == (["a"], "kb-1", ["chunk-1"])
+    assert handle.provider_batch_id == "job-1"
+    assert status.status == "in_progress"
+    cached.close()
+
+
+def test_caching_embedder_handles_large_key_batches(tmp_path):
+    """超过 SQLite 变量上限的键集按批查询，不抛 too many SQL variables"""
+    texts = [f"text-{n:04d}" for n in range(1200)]
+
+    inner = FakeEmbedder()
+    inner.model_id = "test-model"
+    cached = CachingEmbedder(inner, str(tmp_path), cache_size=8)
+    asyncio.run(cached.embed_documents(texts))
+    cached.close()
+
+    # 新实例的 LRU 为空，整个键集走一次持久层查询
+    inner2 = FakeEmbedder()
+    inner2.model_id = "test-model"
+    cached2 = CachingEmbedder(inner2, str(tmp_path), cache_size=8)
+    vectors = asyncio.run(cached2.embed_documents(texts))
+    assert inner2.batches == []
+    assert vectors == [[float(len(text))] for text in texts]
+    cached2.close()
@@ -0,0 +1,101 @@
+import pytest
+
+from langbot_plugin.api.definition.components.rag_engine.engine import (
+    RAGEngine,
+    compile_settings_validator,
+)
+
+
+class StubEngine(RAGEngine):
+    """Minimal concrete engine for schema cache tests."""
+
+    creation_builds = 0
+    retrieval_builds = 0
+
+    def _build_creation_settings_schema(self):
+        type(self).creation_builds += 1
+        return {"type": "object", "properties": {}}
+
+    def _build_retrieval_settings_schema(self):
+        type(self).retrieval_builds += 1
+        return {"type": "object", "properties": dict(self.SEARCH_TUNING_PROPERTIES)}
+
+    async def ingest(self, context):
+        raise NotImplementedError
+
+    async def retrieve(self, context):
+        raise NotImplementedError
+
+    async def delete_document(self, kb_id, document_id):
+        raise NotImplementedError
+
+
+def test_settings_schemas_built_once_per_class():
+    class Engine(StubEngine):
+        pass
+
+    engine = Engine()
+    first = engine.get_creation_settings_schema()
+    second = engine.get_creation_settings_schema()
+    assert first is second  # identity-stable for downstream memoization
+    assert Engine.creation_builds == 1
+
+    # 不同实例共享类级缓存
+    other = Engine()
+    assert other.get_retrieval_settings_schema() is engine.get_retrieval_settings_schema()
+    assert Engine.retrieval_builds == 1
+
+
+def test_schema_cache_is_per_subclass_and_clearable():
+    class EngineA(StubEngine):
+        pass
+
+    class EngineB(StubEngine):
+        pass
+
+    a = EngineA()
+    b = EngineB()
+    assert a.get_creation_settings_schema() is not b.get_creation_settings_schema()
+
+    before = a.get_creation_settings_schema()
+    EngineA.clear_schema_cache()
+    assert a.get_creation_settings_schema() is not before
+
+
+def test_settings_validator_compiled_once_per_schema():
+    class Engine(StubEngine):
+        pass
+
+    engine = Engine()
+    schema = engine.get_retrieval_settings_schema()
+    assert compile_settings_validator(schema) is compile_settings_validator(schema)
+
+    # 合法设置原样返回
+    settings = {"ef": 64}
+    assert engine.validate_retrieval_settings(settings) is settings
+
+
+def test_settings_validator_rejects_invalid_settings():
+    fastjsonschema = pytest.importorskip("fastjsonschema")
+
+    class Engine(StubEngine):
+        pass
+
+    engine = Engine()
+    with pytest.raises(fastjsonschema.JsonSchemaException):
+        engine.validate_retrieval_settings({"ef": "not-an-integer"})
+
+
+def test_settings_validator_not_confused_by_recycled_schema_ids():
+    fastjsonschema = pytest.importorskip("fastjsonschema")
+
+    # 大量短命 schema 会复用 id()；缓存钉住 schema 后不得串用验证器
+    for n in range(64):
+        schema = {
+            "type": "object",
+            "properties": {"value": {"type": "integer", "maximum": n}},
+        }
+        validator = compile_settings_validator(schema)
+        validator({"value": n})
+        with pytest.raises(fastjsonschema.JsonSchemaException):
+            validator({"value": n + 1})
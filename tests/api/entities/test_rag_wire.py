@@ -0,0 +1,63 @@
+import pytest
+
+msgspec = pytest.importorskip("msgspec")
+
+from langbot_plugin.api.entities.builtin.rag import wire
+from langbot_plugin.api.entities.builtin.rag.context import RetrievalContext
+from langbot_plugin.api.entities.builtin.rag.models import (
+    FileMetadata,
+    FileObject,
+    IngestionContext,
+)
+
+
+def test_retrieval_context_round_trip():
+    context = wire.RetrievalContext(
+        query="what is langbot",
+        top_k=3,
+        knowledge_base_id="kb-1",
+        retrieval_settings={"ef": 64},
+    )
+    decoded = wire.decode_retrieval_context(wire.encode(context))
+    assert decoded == context
+    assert decoded.get_collection_id() == "kb-1"
+
+    pydantic_context = decoded.to_pydantic()
+    assert isinstance(pydantic_context, RetrievalContext)
+    assert pydantic_context.query == "what is langbot"
+    assert wire.RetrievalContext.from_pydantic(pydantic_context) == context
+
+
+def test_ingestion_context_round_trip():
+    pydantic_context = IngestionContext(
+        file_object=FileObject(
+            metadata=FileMetadata(
+                filename="doc.pdf",
+                file_size=1024,
+                mime_type="application/pdf",
+                document_id="doc-1",
+                knowledge_base_id="kb-1",
+            ),
+            storage_path="/data/doc.pdf",
+        ),
+        knowledge_base_id="kb-1",
+    )
+
+    context = wire.IngestionContext.from_pydantic(pydantic_context)
+    decoded = wire.decode_ingestion_context(wire.encode(context))
+    assert decoded == context
+    assert decoded.to_pydantic() == pydantic_context
+
+
+def test_result_entries_decode_list():
+    entries = [
+        wire.RetrievalResultEntry(
+            id="r1",
+            content=[{"type": "text", "text": "hello"}],
+            metadata={"document_id": "doc-1"},
+            distance=0.1,
+            score=0.9,
+        )
+    ]
+    decoded = wire.decode_result_entries(wire.encode(entries))
+    assert decoded == entries